@@ -0,0 +1,27 @@
+"""
+Return-data decoding helpers for raw eth_call / JSON-RPC results
+"""
+from typing import Optional
+
+from eth_abi import decode as abi_decode
+
+
+def decode_uint(data: bytes) -> int:
+    """Decode a uint256/uint8 return word (empty data decodes to 0)"""
+    return int.from_bytes(data[:32], "big")
+
+
+def decode_uint8(data: bytes) -> Optional[int]:
+    """Decode a uint8 return word such as decimals(); None if out of range"""
+    value = int.from_bytes(data[:32], "big")
+    return value if value <= 0xFF else None
+
+
+def decode_string(data: bytes) -> str:
+    """Decode an ABI-encoded string return value"""
+    return abi_decode(["string"], data)[0]
+
+
+def decode_quantity(value: str) -> int:
+    """Decode a JSON-RPC hex quantity such as an eth_getBalance result"""
+    return int(value[2:] or "0", 16)
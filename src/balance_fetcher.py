@@ -1,87 +1,173 @@
 """
 Multi-Chain Balance Fetcher - Get native and token balances across chains
 """
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from web3 import Web3
-from decimal import Decimal
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import to_checksum_address
+
+from ._decode import decode_quantity, decode_string, decode_uint, decode_uint8
 
 logger = logging.getLogger(__name__)
 
+# 10**decimals as floats, for converting raw amounts to display balances
+_POW10_FLOAT = [10.0 ** i for i in range(37)]
+# ERC20 decimals() is a uint8
+_MAX_DECIMALS = 255
+# Every supported chain's native token has 18 decimals
+_INV_1E18 = 1e-18
+
+
+def _scale(amount: int, decimals: int) -> float:
+    """Convert a raw integer amount to a human-readable float balance"""
+    if decimals < len(_POW10_FLOAT):
+        return amount / _POW10_FLOAT[decimals]
+    if decimals > _MAX_DECIMALS:
+        raise ValueError(f"Token decimals out of range: {decimals}")
+    return amount / 10 ** decimals
+
+
+@dataclass(frozen=True, slots=True)
+class ChainInfo:
+    """Static chain metadata"""
+    name: str
+    symbol: str
+    decimals: int
+
+
+@lru_cache(maxsize=256)
+def _unknown_chain_info(chain_id: int) -> ChainInfo:
+    """Generic metadata for a chain missing from CHAIN_CONFIG, built once per ID"""
+    return ChainInfo(f"Chain {chain_id}", "UNKNOWN", 18)
+
+
+@lru_cache(maxsize=8192)
+def _checksum(address_lower: str) -> str:
+    """EIP-55 checksum a lowercase address (keccak256 runs once per address)"""
+    return to_checksum_address(address_lower)
+
 
 class BalanceFetcher:
     """Fetch wallet balances across multiple chains"""
 
-    # ERC20 ABI (minimal)
-    ERC20_ABI = [
-        {
-            "constant": True,
-            "inputs": [{"name": "_owner", "type": "address"}],
-            "name": "balanceOf",
-            "outputs": [{"name": "balance", "type": "uint256"}],
-            "type": "function"
-        },
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "decimals",
-            "outputs": [{"name": "", "type": "uint8"}],
-            "type": "function"
-        },
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "symbol",
-            "outputs": [{"name": "", "type": "string"}],
-            "type": "function"
-        },
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "name",
-            "outputs": [{"name": "", "type": "string"}],
-            "type": "function"
-        }
-    ]
+    # ERC20 function selectors (first 4 bytes of keccak256 of the signature)
+    BALANCE_OF_SELECTOR = b"\x70\xa0\x82\x31"
+    DECIMALS_SELECTOR = b"\x31\x3c\xe5\x67"
+    SYMBOL_SELECTOR = b"\x95\xd8\x9b\x41"
+    NAME_SELECTOR = b"\x06\xfd\xde\x03"
+
+    # Multicall3 (same address on every supported chain)
+    MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+    AGGREGATE3_SELECTOR = b"\x82\xad\x56\xcb"
+    GET_ETH_BALANCE_SELECTOR = b"\x4d\x23\x01\xcc"
 
     # Chain configurations
     CHAIN_CONFIG = {
-        1: {"name": "Ethereum", "symbol": "ETH", "decimals": 18},
-        56: {"name": "BNB Chain", "symbol": "BNB", "decimals": 18},
-        137: {"name": "Polygon", "symbol": "MATIC", "decimals": 18},
-        42161: {"name": "Arbitrum", "symbol": "ETH", "decimals": 18},
-        10: {"name": "Optimism", "symbol": "ETH", "decimals": 18},
-        8453: {"name": "Base", "symbol": "ETH", "decimals": 18},
-        43114: {"name": "Avalanche", "symbol": "AVAX", "decimals": 18},
+        1: ChainInfo("Ethereum", "ETH", 18),
+        56: ChainInfo("BNB Chain", "BNB", 18),
+        137: ChainInfo("Polygon", "MATIC", 18),
+        42161: ChainInfo("Arbitrum", "ETH", 18),
+        10: ChainInfo("Optimism", "ETH", 18),
+        8453: ChainInfo("Base", "ETH", 18),
+        43114: ChainInfo("Avalanche", "AVAX", 18),
+    }
+
+    # Well-known token metadata: (chain_id, token_address) -> (decimals, symbol, name)
+    KNOWN_TOKENS = {
+        (1, "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"): (6, "USDC", "USD Coin"),
+        (1, "0xdac17f958d2ee523a2206206994597c13d831ec7"): (6, "USDT", "Tether USD"),
+        (1, "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"): (18, "WETH", "Wrapped Ether"),
+        (1, "0x2260fac5e5542a773aa44fbcfedf7c193bc2c599"): (8, "WBTC", "Wrapped BTC"),
+        (56, "0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d"): (18, "USDC", "USD Coin"),
+        (56, "0x55d398326f99059ff775485246999027b3197955"): (18, "USDT", "Tether USD"),
+        (56, "0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c"): (18, "WBNB", "Wrapped BNB"),
+        (137, "0x3c499c542cef5e3811e1192ce70d8cc03d5c3359"): (6, "USDC", "USD Coin"),
+        (137, "0x7ceb23fd6bc0add59e62ac25578270cff1b9f619"): (18, "WETH", "Wrapped Ether"),
+        (137, "0x0d500b1d8e8ef31e21c99d1db9a6444d3adf1270"): (18, "WMATIC", "Wrapped Matic"),
+        (42161, "0xaf88d065e77c8cc2239327c5edb3a432268e5831"): (6, "USDC", "USD Coin"),
+        (42161, "0x82af49447d8a07e3bd95bd0d56f35241523fbab1"): (18, "WETH", "Wrapped Ether"),
+        (42161, "0x2f2a2543b76a4166549f7aab2e75bef0aefc5b0f"): (8, "WBTC", "Wrapped BTC"),
+        (10, "0x0b2c639c533813f4aa9d7837caf62653d097ff85"): (6, "USDC", "USD Coin"),
+        (10, "0x4200000000000000000000000000000000000006"): (18, "WETH", "Wrapped Ether"),
+        (10, "0x68f180fcce6836688e9084f035309e29bf0a2095"): (8, "WBTC", "Wrapped BTC"),
+        (8453, "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913"): (6, "USDC", "USD Coin"),
+        (8453, "0x4200000000000000000000000000000000000006"): (18, "WETH", "Wrapped Ether"),
+        (43114, "0xb97ef9ef8734c71904d8002f8b6bc66dd9c48a6e"): (6, "USDC", "USD Coin"),
+        (43114, "0xb31f66aa3c1e785363f0875a1b74e27b85fd66c7"): (18, "WAVAX", "Wrapped AVAX"),
     }
 
     def __init__(self, rpc_urls: Dict[int, str]):
         """
-        Initialize with RPC URLs (lazy loading)
+        Initialize with RPC URLs
 
         Args:
             rpc_urls: Dict mapping chain_id to RPC URL
         """
         self.rpc_urls = rpc_urls
-        self.w3_instances = {}  # Cache for lazy-loaded instances
+        self._client: Optional[httpx.AsyncClient] = None
+        # Token metadata never changes, so it is cached for the process lifetime
+        self._meta_cache: Dict[Tuple[int, str], Tuple[int, str, str]] = dict(self.KNOWN_TOKENS)
+
+    async def startup(self):
+        """Create the shared HTTP client (call on app startup)"""
+        self._get_client()
 
-    def _get_w3(self, chain_id: int) -> Optional[Web3]:
-        """Get or create Web3 instance for chain (lazy loading)"""
-        if chain_id in self.w3_instances:
-            return self.w3_instances[chain_id]
+    async def close(self):
+        """Close the shared HTTP client (call on app shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get or create the shared HTTP client used for all RPC calls.
+
+        HTTP/2 is negotiated where the RPC provider supports it, so concurrent
+        calls to one endpoint are multiplexed over a single connection;
+        other endpoints transparently use pooled HTTP/1.1 keep-alive.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._client
+
+    async def _post(self, chain_id: int, payload: Any) -> Any:
+        """POST a JSON-RPC payload (single or batch) to the chain's RPC URL"""
         rpc_url = self.rpc_urls.get(chain_id)
         if not rpc_url:
-            return None
-
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url))
-            self.w3_instances[chain_id] = w3
-            logger.info(f"Initialized Web3 for chain {chain_id}")
-            return w3
-        except Exception as e:
-            logger.error(f"Failed to initialize Web3 for chain {chain_id}: {e}")
-            return None
+            raise ValueError(f"Chain {chain_id} not supported")
+
+        response = await self._get_client().post(rpc_url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _rpc(self, chain_id: int, method: str, params: List) -> Any:
+        """Send a single JSON-RPC request and return its result"""
+        data = await self._post(chain_id, {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": method,
+            "params": params
+        })
+        if data.get("error"):
+            raise RuntimeError(f"RPC error on chain {chain_id}: {data['error']}")
+        return data.get("result")
+
+    async def _eth_call(self, chain_id: int, to: str, calldata: bytes) -> bytes:
+        """Call a contract view function and return the raw return data"""
+        result = await self._rpc(
+            chain_id,
+            "eth_call",
+            [{"to": to, "data": "0x" + calldata.hex()}, "latest"]
+        )
+        return bytes.fromhex(result[2:])
 
     async def get_native_balance(
         self,
@@ -99,32 +185,19 @@ class BalanceFetcher:
             Dict with balance data
         """
         try:
-            w3 = self._get_w3(chain_id)
-            if not w3:
+            if chain_id not in self.rpc_urls:
                 return {
                     "chain_id": chain_id,
-                    "error": f"Chain {chain_id} not supported or failed to initialize"
+                    "error": f"Chain {chain_id} not supported"
                 }
 
-            chain_info = self.CHAIN_CONFIG.get(chain_id, {})
-
             # Normalize address
             address = self._normalize_address(wallet_address)
 
             # Get balance
-            balance_wei = w3.eth.get_balance(address)
-            balance = Decimal(balance_wei) / Decimal(10 ** chain_info.get("decimals", 18))
+            balance_wei = decode_quantity(await self._rpc(chain_id, "eth_getBalance", [address, "latest"]))
 
-            return {
-                "chain_id": chain_id,
-                "chain_name": chain_info.get("name", f"Chain {chain_id}"),
-                "token_type": "native",
-                "symbol": chain_info.get("symbol", "UNKNOWN"),
-                "balance": float(balance),
-                "balance_wei": int(balance_wei),
-                "decimals": chain_info.get("decimals", 18),
-                "contract_address": None
-            }
+            return self._format_native_balance(chain_id, balance_wei)
 
         except Exception as e:
             logger.error(f"Native balance fetch error on chain {chain_id}: {e}")
@@ -151,53 +224,54 @@ class BalanceFetcher:
             Dict with token balance data
         """
         try:
-            w3 = self._get_w3(chain_id)
-            if not w3:
+            if chain_id not in self.rpc_urls:
                 return {
                     "chain_id": chain_id,
-                    "error": f"Chain {chain_id} not supported or failed to initialize"
+                    "error": f"Chain {chain_id} not supported"
                 }
 
             # Normalize addresses
             wallet = self._normalize_address(wallet_address)
             token = self._normalize_address(token_address)
 
-            # Create contract instance
-            contract = w3.eth.contract(address=token, abi=self.ERC20_ABI)
-
             # Get balance
-            balance_raw = contract.functions.balanceOf(wallet).call()
-
-            # Get token metadata
-            try:
-                decimals = contract.functions.decimals().call()
-            except:
-                decimals = 18
+            balance_data = await self._eth_call(
+                chain_id, token, self.BALANCE_OF_SELECTOR + self._encode_address(wallet)
+            )
+            balance_raw = decode_uint(balance_data)
 
-            try:
-                symbol = contract.functions.symbol().call()
-            except:
-                symbol = "UNKNOWN"
+            # Empty balances are skipped by callers, so don't pay for metadata
+            if balance_raw == 0:
+                return {
+                    "chain_id": chain_id,
+                    "chain_name": self._chain_info(chain_id).name,
+                    "token_type": "erc20",
+                    "contract_address": token_address.lower(),
+                    "balance": 0.0,
+                    "balance_raw": 0
+                }
 
-            try:
-                name = contract.functions.name().call()
-            except:
-                name = "Unknown Token"
+            # Get token metadata
+            metadata = self._meta_cache.get((chain_id, token.lower()))
+            if metadata is None:
+                metadata_results = await asyncio.gather(
+                    *(
+                        self._eth_call(chain_id, token, selector)
+                        for selector in (self.DECIMALS_SELECTOR, self.SYMBOL_SELECTOR, self.NAME_SELECTOR)
+                    ),
+                    return_exceptions=True
+                )
+                metadata = self._resolve_metadata(
+                    chain_id,
+                    token,
+                    *(None if isinstance(r, Exception) else r for r in metadata_results)
+                )
 
-            # Calculate human-readable balance
-            balance = Decimal(balance_raw) / Decimal(10 ** decimals)
+            decimals, symbol, name = metadata
 
-            return {
-                "chain_id": chain_id,
-                "chain_name": self.CHAIN_CONFIG.get(chain_id, {}).get("name", f"Chain {chain_id}"),
-                "token_type": "erc20",
-                "contract_address": token_address.lower(),
-                "symbol": symbol,
-                "name": name,
-                "balance": float(balance),
-                "balance_raw": int(balance_raw),
-                "decimals": decimals
-            }
+            return self._format_token_balance(
+                chain_id, token_address, balance_raw, decimals, symbol, name
+            )
 
         except Exception as e:
             logger.error(f"Token balance fetch error: {e}")
@@ -216,6 +290,13 @@ class BalanceFetcher:
         """
         Get all token balances for a wallet
 
+        Reads run in two phases: native balance plus balanceOf for every
+        token, then decimals/symbol/name only for tokens the wallet holds
+        and whose metadata is not cached. Each phase is folded into a
+        single Multicall3 aggregate3 eth_call. If that fails, the same
+        reads are sent as one JSON-RPC batch, and as a last resort one
+        call per value.
+
         Args:
             wallet_address: Wallet address
             chain_id: Blockchain ID
@@ -224,31 +305,304 @@ class BalanceFetcher:
         Returns:
             List of token balances
         """
+        if chain_id not in self.rpc_urls:
+            logger.error(f"Chain {chain_id} not supported")
+            return []
+
+        try:
+            wallet = self._normalize_address(wallet_address)
+        except ValueError as e:
+            logger.error(f"Native balance fetch error on chain {chain_id}: {e}")
+            return []
+
+        tokens = []
+        for token_address in token_addresses or []:
+            try:
+                tokens.append(self._normalize_address(token_address))
+            except ValueError as e:
+                logger.error(f"Token balance fetch error: {e}")
+
+        for fetch in (self._fetch_multicall, self._fetch_batched):
+            try:
+                values = await fetch(chain_id, self._balance_reads(wallet, tokens))
+
+                # Only held tokens without cached metadata need a second round
+                needs_metadata = [
+                    token for token in tokens
+                    if decode_uint(values.get((token, "balance"), b"")) > 0
+                    and (chain_id, token.lower()) not in self._meta_cache
+                ]
+                if needs_metadata:
+                    values.update(await fetch(chain_id, self._metadata_reads(needs_metadata)))
+
+                return self._collect_balances(chain_id, tokens, values)
+            except Exception as e:
+                logger.warning(f"{fetch.__name__} failed on chain {chain_id}: {e}")
+
+        return await self._get_wallet_tokens_individually(
+            wallet_address, chain_id, token_addresses
+        )
+
+    def _balance_reads(
+        self,
+        wallet: str,
+        tokens: List[str]
+    ) -> List[Tuple[Tuple[Optional[str], str], Optional[str], bytes]]:
+        """
+        Build ((token, field), target, calldata) for the native balance and
+        every balanceOf. The native read has no target; its calldata is the
+        encoded wallet address.
+        """
+        owner_arg = self._encode_address(wallet)
+        reads = [((None, "balance"), None, owner_arg)]
+        for token in tokens:
+            reads.append(((token, "balance"), token, self.BALANCE_OF_SELECTOR + owner_arg))
+        return reads
+
+    def _metadata_reads(
+        self,
+        tokens: List[str]
+    ) -> List[Tuple[Tuple[Optional[str], str], Optional[str], bytes]]:
+        """Build ((token, field), target, calldata) for decimals/symbol/name"""
+        reads = []
+        for token in tokens:
+            reads.append(((token, "decimals"), token, self.DECIMALS_SELECTOR))
+            reads.append(((token, "symbol"), token, self.SYMBOL_SELECTOR))
+            reads.append(((token, "name"), token, self.NAME_SELECTOR))
+        return reads
+
+    async def _fetch_multicall(
+        self,
+        chain_id: int,
+        reads: List[Tuple[Tuple[Optional[str], str], Optional[str], bytes]]
+    ) -> Dict[Tuple[Optional[str], str], bytes]:
+        """Fetch reads through one Multicall3 aggregate3 eth_call"""
+        calls = []
+        for _, target, calldata in reads:
+            if target is None:
+                calls.append((self.MULTICALL3_ADDRESS, True, self.GET_ETH_BALANCE_SELECTOR + calldata))
+            else:
+                calls.append((target, True, calldata))
+
+        payload = self.AGGREGATE3_SELECTOR + abi_encode(["(address,bool,bytes)[]"], [calls])
+        result = await self._eth_call(chain_id, self.MULTICALL3_ADDRESS, payload)
+        (results,) = abi_decode(["(bool,bytes)[]"], result)
+
+        values = {}
+        for (key, _, _), (success, return_data) in zip(reads, results):
+            if success:
+                values[key] = return_data
+            else:
+                logger.warning(f"Multicall3 read {key[1]} failed for {key[0] or 'native'} on chain {chain_id}")
+        return values
+
+    async def _fetch_batched(
+        self,
+        chain_id: int,
+        reads: List[Tuple[Tuple[Optional[str], str], Optional[str], bytes]]
+    ) -> Dict[Tuple[Optional[str], str], bytes]:
+        """Fetch reads with one JSON-RPC batch request"""
+        batch = []
+        for request_id, (_, target, calldata) in enumerate(reads):
+            if target is None:
+                method, params = "eth_getBalance", ["0x" + calldata[12:].hex(), "latest"]
+            else:
+                method, params = "eth_call", [{"to": target, "data": "0x" + calldata.hex()}, "latest"]
+            batch.append({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": method,
+                "params": params
+            })
+
+        responses = await self._post(chain_id, batch)
+        if not isinstance(responses, list):
+            raise ValueError(f"Unexpected batch response: {responses}")
+
+        # Map responses back to (token, field) by request id
+        values = {}
+        for item in responses:
+            request_id = item.get("id")
+            result = item.get("result")
+            if isinstance(request_id, int) and 0 <= request_id < len(reads) and result is not None:
+                key, target, _ = reads[request_id]
+                if target is None:
+                    # eth_getBalance returns a quantity, not ABI-encoded data
+                    values[key] = decode_quantity(result).to_bytes(32, "big")
+                else:
+                    values[key] = bytes.fromhex(result[2:])
+        return values
+
+    def _collect_balances(
+        self,
+        chain_id: int,
+        tokens: List[str],
+        values: Dict[Tuple[Optional[str], str], bytes]
+    ) -> List[Dict]:
+        """Turn raw read results into balance dicts, skipping empty tokens"""
         balances = []
 
-        # Always get native balance
-        native_balance = await self.get_native_balance(wallet_address, chain_id)
-        if not native_balance.get("error"):
+        native_data = values.get((None, "balance"))
+        if native_data is not None:
+            balances.append(
+                self._format_native_balance(chain_id, decode_uint(native_data))
+            )
+        else:
+            logger.error(f"Native balance fetch error on chain {chain_id}")
+
+        for token in tokens:
+            balance_data = values.get((token, "balance"))
+            if balance_data is None:
+                logger.error(f"Token balance fetch error: no balanceOf result for {token}")
+                continue
+
+            balance_raw = decode_uint(balance_data)
+            if balance_raw <= 0:
+                continue
+
+            metadata = self._meta_cache.get((chain_id, token.lower()))
+            if metadata is None:
+                metadata = self._resolve_metadata(
+                    chain_id,
+                    token,
+                    values.get((token, "decimals")),
+                    values.get((token, "symbol")),
+                    values.get((token, "name"))
+                )
+
+            decimals, symbol, name = metadata
+            balances.append(
+                self._format_token_balance(chain_id, token, balance_raw, decimals, symbol, name)
+            )
+
+        return balances
+
+    async def _get_wallet_tokens_individually(
+        self,
+        wallet_address: str,
+        chain_id: int,
+        token_addresses: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Fetch balances with one RPC call per value, all tokens concurrently"""
+        # Always get native balance, plus any specified token balances
+        tasks = [self.get_native_balance(wallet_address, chain_id)]
+        for token_address in token_addresses or []:
+            tasks.append(self.get_token_balance(wallet_address, token_address, chain_id))
+
+        native_balance, *token_balances = await asyncio.gather(*tasks, return_exceptions=True)
+
+        balances = []
+        if isinstance(native_balance, dict) and not native_balance.get("error"):
             balances.append(native_balance)
 
-        # Get specified token balances
-        if token_addresses:
-            for token_address in token_addresses:
-                token_balance = await self.get_token_balance(
-                    wallet_address,
-                    token_address,
-                    chain_id
-                )
-                # Only include if balance > 0 or no error
-                if not token_balance.get("error"):
-                    if token_balance.get("balance", 0) > 0:
-                        balances.append(token_balance)
+        # Only include tokens without errors and with balance > 0
+        balances.extend(
+            b for b in token_balances
+            if isinstance(b, dict) and not b.get("error") and b.get("balance", 0) > 0
+        )
 
         return balances
 
+    def _resolve_metadata(
+        self,
+        chain_id: int,
+        token: str,
+        decimals_data: Optional[bytes],
+        symbol_data: Optional[bytes],
+        name_data: Optional[bytes]
+    ) -> Tuple[int, str, str]:
+        """Decode token metadata and cache it if every read succeeded"""
+        metadata = self._parse_token_metadata(decimals_data, symbol_data, name_data)
+        if (
+            decimals_data is not None
+            and symbol_data is not None
+            and name_data is not None
+            and decode_uint8(decimals_data) is not None
+        ):
+            self._meta_cache[(chain_id, token.lower())] = metadata
+        return metadata
+
+    def _parse_token_metadata(
+        self,
+        decimals_data: Optional[bytes],
+        symbol_data: Optional[bytes],
+        name_data: Optional[bytes]
+    ) -> Tuple[int, str, str]:
+        """Decode raw decimals/symbol/name results, falling back to defaults"""
+        decimals = decode_uint8(decimals_data) if decimals_data else None
+        if decimals is None:
+            decimals = 18
+
+        try:
+            symbol = decode_string(symbol_data)
+        except Exception:
+            symbol = "UNKNOWN"
+
+        try:
+            name = decode_string(name_data)
+        except Exception:
+            name = "Unknown Token"
+
+        return decimals, symbol, name
+
+    def _chain_info(self, chain_id: int) -> ChainInfo:
+        """Look up chain metadata, with a generic entry for unknown chains"""
+        chain_info = self.CHAIN_CONFIG.get(chain_id)
+        if chain_info is None:
+            return _unknown_chain_info(chain_id)
+        return chain_info
+
+    def _format_native_balance(self, chain_id: int, balance_wei: int) -> Dict:
+        """Build native balance result"""
+        chain_info = self._chain_info(chain_id)
+        decimals = chain_info.decimals
+        if decimals == 18:
+            balance = balance_wei * _INV_1E18
+        else:
+            balance = _scale(balance_wei, decimals)
+
+        return {
+            "chain_id": chain_id,
+            "chain_name": chain_info.name,
+            "token_type": "native",
+            "symbol": chain_info.symbol,
+            "balance": balance,
+            "balance_wei": int(balance_wei),
+            "decimals": decimals,
+            "contract_address": None
+        }
+
+    def _format_token_balance(
+        self,
+        chain_id: int,
+        token_address: str,
+        balance_raw: int,
+        decimals: int,
+        symbol: str,
+        name: str
+    ) -> Dict:
+        """Build ERC20 balance result"""
+        balance = _scale(balance_raw, decimals)
+
+        return {
+            "chain_id": chain_id,
+            "chain_name": self._chain_info(chain_id).name,
+            "token_type": "erc20",
+            "contract_address": token_address.lower(),
+            "symbol": symbol,
+            "name": name,
+            "balance": balance,
+            "balance_raw": int(balance_raw),
+            "decimals": decimals
+        }
+
+    def _encode_address(self, address: str) -> bytes:
+        """ABI-encode an address as a 32-byte word"""
+        return bytes(12) + bytes.fromhex(address[2:])
+
     def _normalize_address(self, address: str) -> str:
-        """Simple address normalization"""
+        """Validate an address and return its checksummed form"""
         address = address.strip()
         if not address.startswith('0x') or len(address) != 42:
             raise ValueError(f"Invalid address: {address}")
-        return address
+        return _checksum(address.lower())
@@ -3,25 +3,29 @@ Wallet Portfolio Tracker - Multi-chain portfolio aggregation with valuations
 
 x402-enabled microservice for comprehensive wallet tracking
 """
+import hashlib
 import logging
 import os
 import asyncio
+from dataclasses import fields, replace
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from web3 import Web3
+import orjson
 
 from .balance_fetcher import BalanceFetcher
 from .portfolio_aggregator import PortfolioAggregator
-from .x402_middleware_dual import X402Middleware
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (deployments that inject env can skip .env by
+# setting LOAD_DOTENV=false in the process environment; .env can't disable itself)
+if os.getenv("LOAD_DOTENV", "true").lower() == "true":
+    load_dotenv()
 
 # Configure logging
 logging.basicConfig(
@@ -36,7 +40,8 @@ app = FastAPI(
     description="Multi-chain wallet portfolio aggregation with real-time valuations across 7+ chains",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -54,6 +59,8 @@ PAYMENT_ADDRESS = os.getenv("PAYMENT_ADDRESS", "0x01D11F7e1a46AbFC6092d7be484895
 PORT = int(os.getenv("PORT", "8000"))
 BASE_URL = os.getenv("BASE_URL", f"http://localhost:{PORT}")
 PRICE_ORACLE_URL = os.getenv("PRICE_ORACLE_URL", "https://price-oracle-production-9e7c.up.railway.app")
+PORTFOLIO_CACHE_TTL = int(os.getenv("PORTFOLIO_CACHE_TTL", "15"))
+REDIS_URL = os.getenv("REDIS_URL")
 
 # RPC URLs
 RPC_URLS = {
@@ -66,9 +73,36 @@ RPC_URLS = {
     43114: os.getenv("AVALANCHE_RPC_URL", "https://api.avax.network/ext/bc/C/rpc"),
 }
 
-# Initialize services with RPC URLs (lazy loading)
+# Initialize services with RPC URLs
 balance_fetcher = BalanceFetcher(RPC_URLS)
-portfolio_aggregator = PortfolioAggregator(PRICE_ORACLE_URL)
+# Optional Redis shared by all workers for oracle prices
+redis_client = None
+if REDIS_URL:
+    from redis.asyncio import Redis
+    redis_client = Redis.from_url(REDIS_URL)
+
+portfolio_aggregator = PortfolioAggregator(PRICE_ORACLE_URL, redis=redis_client)
+
+# Encoded portfolio responses keyed by (wallet, chains, tokens, top_k), plus
+# the fetch in flight per key so identical concurrent requests share it
+portfolio_cache: TTLCache = TTLCache(maxsize=1024, ttl=PORTFOLIO_CACHE_TTL)
+portfolio_fetches: Dict[tuple, asyncio.Future] = {}
+
+
+@app.on_event("startup")
+async def startup():
+    """Open shared HTTP connection pools"""
+    await balance_fetcher.startup()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close shared HTTP and Redis connection pools"""
+    await balance_fetcher.close()
+    await portfolio_aggregator.close()
+    if redis_client is not None:
+        await redis_client.aclose()
+
 
 if FREE_MODE:
     logger.warning("Running in FREE MODE - no payment verification")
@@ -79,20 +113,23 @@ logger.info(f"Portfolio tracker initialized with {len(RPC_URLS)} chains")
 logger.info(f"PORT from environment: {PORT}")
 logger.info(f"BASE_URL: {BASE_URL}")
 
-# x402 Payment Middleware
+# x402 Payment Middleware (in free mode it would only pass requests through)
 payment_address = PAYMENT_ADDRESS
 base_url = BASE_URL.rstrip('/')
 
-app.add_middleware(
-    X402Middleware,
-    payment_address=payment_address,
-    base_url=base_url,
-    facilitator_urls=[
-        "https://facilitator.daydreams.systems",
-        "https://api.cdp.coinbase.com/platform/v2/x402/facilitator"
-    ],
-    free_mode=FREE_MODE,
-)
+if not FREE_MODE:
+    from .x402_middleware_dual import X402Middleware
+
+    app.add_middleware(
+        X402Middleware,
+        payment_address=payment_address,
+        base_url=base_url,
+        facilitator_urls=[
+            "https://facilitator.daydreams.systems",
+            "https://api.cdp.coinbase.com/platform/v2/x402/facilitator"
+        ],
+        free_mode=FREE_MODE,
+    )
 
 
 # Request/Response Models
@@ -107,15 +144,21 @@ class PortfolioRequest(BaseModel):
         default=None,
         description="Specific token addresses to check (optional)"
     )
+    top_k: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Only return the N most valuable chains and tokens in each breakdown (optional)"
+    )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "wallet_address": "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045",
                 "chains": [1, 137, 42161],
                 "tokens": ["0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"]
             }
         }
+    )
 
 
 class PortfolioResponse(BaseModel):
@@ -132,11 +175,25 @@ class PortfolioResponse(BaseModel):
     timestamp: str
 
 
+def _etag(content: bytes) -> str:
+    """Strong ETag for a static payload"""
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+def _not_modified(http_request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client's If-None-Match already matches etag, else None"""
+    if_none_match = http_request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    if if_none_match.strip() != "*" and etag not in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ):
+        return None
+    return Response(status_code=304, headers={"ETag": etag})
+
+
 # API Endpoints
-@app.get("/", response_class=HTMLResponse)
-async def landing_page():
-    """Landing page with metadata"""
-    return """
+_LANDING_BYTES = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -200,18 +257,34 @@ async def landing_page():
         </div>
     </body>
     </html>
-    """
+    """.encode("utf-8")
+_LANDING_ETAG = _etag(_LANDING_BYTES)
 
 
-@app.get("/favicon.ico")
-async def favicon():
-    """Favicon endpoint returning SVG with emoji"""
-    svg = """
+@app.get("/", response_class=HTMLResponse)
+async def landing_page(http_request: Request):
+    """Landing page with metadata"""
+    not_modified = _not_modified(http_request, _LANDING_ETAG)
+    if not_modified is not None:
+        return not_modified
+    return HTMLResponse(content=_LANDING_BYTES, headers={"ETag": _LANDING_ETAG})
+
+
+_FAVICON_BYTES = """
     <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">
         <text y="85" font-size="90">💼</text>
     </svg>
-    """
-    return Response(content=svg, media_type="image/svg+xml")
+    """.encode("utf-8")
+_FAVICON_ETAG = _etag(_FAVICON_BYTES)
+
+
+@app.get("/favicon.ico")
+async def favicon(http_request: Request):
+    """Favicon endpoint returning SVG with emoji"""
+    not_modified = _not_modified(http_request, _FAVICON_ETAG)
+    if not_modified is not None:
+        return not_modified
+    return Response(content=_FAVICON_BYTES, media_type="image/svg+xml", headers={"ETag": _FAVICON_ETAG})
 
 
 @app.get("/health")
@@ -227,58 +300,128 @@ async def health():
     }
 
 
+_PAYMENT_REQUIRED_JSON = orjson.dumps({
+    "x402Version": 1,
+    "accepts": [
+        {
+            "scheme": "exact",
+            "network": "base",
+            "maxAmountRequired": "50000",  # 0.05 USDC (6 decimals)
+            "resource": f"{base_url}/entrypoints/portfolio-tracker/invoke",
+            "description": "Multi-chain wallet portfolio aggregation with real-time valuations",
+            "mimeType": "application/json",
+            "payTo": payment_address,
+            "maxTimeoutSeconds": 30,
+            "asset": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",  # USDC on Base
+            "outputSchema": {
+                "input": {
+                    "type": "http",
+                    "method": "POST",
+                    "bodyType": "json",
+                    "bodyFields": {
+                        "wallet_address": {
+                            "type": "string",
+                            "required": True,
+                            "description": "Wallet address to track"
+                        },
+                        "chains": {
+                            "type": "array",
+                            "required": False,
+                            "description": "Specific chains to check (default: all supported chains)"
+                        },
+                        "tokens": {
+                            "type": "array",
+                            "required": False,
+                            "description": "Specific token addresses to check (optional)"
+                        },
+                        "top_k": {
+                            "type": "integer",
+                            "required": False,
+                            "minimum": 1,
+                            "description": "Only return the N most valuable chains and tokens in each breakdown (optional)"
+                        }
+                    }
+                },
+                "output": {
+                    "type": "object",
+                    "description": "Comprehensive wallet portfolio with total value, breakdowns by chain and token"
+                }
+            }
+        }
+    ]
+})
+
+
 @app.get("/entrypoints/portfolio-tracker/invoke")
 @app.head("/entrypoints/portfolio-tracker/invoke")
 async def get_portfolio_metadata():
     """Returns HTTP 402 with x402 metadata for portfolio tracker entrypoint"""
-    from fastapi.responses import JSONResponse
+    return Response(content=_PAYMENT_REQUIRED_JSON, status_code=402, media_type="application/json")
+
+
+async def _iter_chain_balances(
+    request: PortfolioRequest,
+    chains_to_check: List[int]
+) -> AsyncIterator[List[Dict]]:
+    """Yield each chain's balances as soon as that chain's fetch completes"""
+    # Fetch balances across all chains in parallel
+    tasks = [
+        asyncio.ensure_future(
+            balance_fetcher.get_wallet_tokens(
+                request.wallet_address,
+                chain_id,
+                request.tokens
+            )
+        )
+        for chain_id in chains_to_check
+    ]
 
-    metadata = {
-        "x402Version": 1,
-        "accepts": [
-            {
-                "scheme": "exact",
-                "network": "base",
-                "maxAmountRequired": "50000",  # 0.05 USDC (6 decimals)
-                "resource": f"{base_url}/entrypoints/portfolio-tracker/invoke",
-                "description": "Multi-chain wallet portfolio aggregation with real-time valuations",
-                "mimeType": "application/json",
-                "payTo": payment_address,
-                "maxTimeoutSeconds": 30,
-                "asset": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",  # USDC on Base
-                "outputSchema": {
-                    "input": {
-                        "type": "http",
-                        "method": "POST",
-                        "bodyType": "json",
-                        "bodyFields": {
-                            "wallet_address": {
-                                "type": "string",
-                                "required": True,
-                                "description": "Wallet address to track"
-                            },
-                            "chains": {
-                                "type": "array",
-                                "required": False,
-                                "description": "Specific chains to check (default: all supported chains)"
-                            },
-                            "tokens": {
-                                "type": "array",
-                                "required": False,
-                                "description": "Specific token addresses to check (optional)"
-                            }
-                        }
-                    },
-                    "output": {
-                        "type": "object",
-                        "description": "Comprehensive wallet portfolio with total value, breakdowns by chain and token"
-                    }
-                }
-            }
-        ]
-    }
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                result = await next_result
+            except Exception as e:
+                logger.error(f"Balance fetch error: {e}")
+                continue
+            if isinstance(result, list):
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _finish_portfolio_fetch(cache_key: tuple, fetch: asyncio.Future):
+    """Cache a shared portfolio fetch's body if it succeeded, then release it"""
+    if portfolio_fetches.get(cache_key) is fetch:
+        del portfolio_fetches[cache_key]
+    if not fetch.cancelled() and fetch.exception() is None:
+        portfolio_cache[cache_key] = fetch.result()
+
+
+async def _fetch_portfolio(request: PortfolioRequest, chains_to_check: List[int]) -> bytes:
+    """Fetch balances, aggregate them and return the encoded response body"""
+    try:
+        logger.info(f"Fetching portfolio for {request.wallet_address}")
+
+        # Aggregate portfolio, pricing each chain's tokens as its balances arrive
+        portfolio = await portfolio_aggregator.aggregate_portfolio(
+            request.wallet_address,
+            _iter_chain_balances(request, chains_to_check),
+            top_k=request.top_k
+        )
+
+        # Add timestamp
+        portfolio = replace(portfolio, timestamp=datetime.utcnow().isoformat() + "Z")
 
-    return JSONResponse(content=metadata, status_code=402)
+        # PortfolioSummary already has the PortfolioResponse shape, so it is
+        # encoded directly instead of being rebuilt and re-validated
+        return orjson.dumps(
+            {field.name: getattr(portfolio, field.name) for field in fields(portfolio)}
+        )
+
+    except Exception as e:
+        logger.error(f"Portfolio fetch error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Portfolio fetch failed: {str(e)}")
 
 
 @app.post(
@@ -287,7 +430,7 @@ async def get_portfolio_metadata():
     summary="Get Wallet Portfolio",
     description="Get comprehensive wallet portfolio across multiple chains with valuations"
 )
-async def get_portfolio(request: PortfolioRequest):
+async def get_portfolio(request: PortfolioRequest, http_request: Request):
     """
     Get wallet portfolio across multiple chains
 
@@ -311,188 +454,193 @@ async def get_portfolio(request: PortfolioRequest):
     - Asset allocation analysis
     - Multi-chain balance checking
     """
-    try:
-        logger.info(f"Fetching portfolio for {request.wallet_address}")
-
-        # Determine which chains to check
-        chains_to_check = request.chains if request.chains else list(RPC_URLS.keys())
-
-        # Fetch balances across all chains in parallel
-        tasks = []
-        for chain_id in chains_to_check:
-            if chain_id in RPC_URLS:
-                task = balance_fetcher.get_wallet_tokens(
-                    request.wallet_address,
-                    chain_id,
-                    request.tokens
-                )
-                tasks.append(task)
-
-        # Execute in parallel
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Flatten results
-        all_balances = []
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Balance fetch error: {result}")
-                continue
-            if isinstance(result, list):
-                all_balances.extend(result)
+    # Determine which chains to check
+    chains_to_check = [
+        chain_id for chain_id in (request.chains or RPC_URLS.keys())
+        if chain_id in RPC_URLS
+    ]
+
+    # The body echoes wallet_address verbatim, so the key uses it as sent
+    cache_key = (
+        request.wallet_address,
+        tuple(sorted(chains_to_check)),
+        tuple(sorted(token.strip().lower() for token in request.tokens or ())),
+        request.top_k
+    )
 
-        # Aggregate portfolio
-        portfolio = await portfolio_aggregator.aggregate_portfolio(
-            request.wallet_address,
-            all_balances
-        )
+    if "no-cache" in http_request.headers.get("cache-control", "").lower():
+        cache_status = "BYPASS"
+        body = await _fetch_portfolio(request, chains_to_check)
+        portfolio_cache[cache_key] = body
+    else:
+        cache_status = "HIT"
+        body = portfolio_cache.get(cache_key)
+        if body is None:
+            # Concurrent identical requests share the first one's fetch,
+            # including its failure, instead of each repeating it
+            fetch = portfolio_fetches.get(cache_key)
+            if fetch is None:
+                cache_status = "MISS"
+                fetch = asyncio.ensure_future(_fetch_portfolio(request, chains_to_check))
+                portfolio_fetches[cache_key] = fetch
+                fetch.add_done_callback(lambda done: _finish_portfolio_fetch(cache_key, done))
+            body = await asyncio.shield(fetch)
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Portfolio-Cache": cache_status}
+    )
 
-        # Add timestamp
-        portfolio.timestamp = datetime.utcnow().isoformat() + "Z"
-
-        return PortfolioResponse(
-            wallet_address=portfolio.wallet_address,
-            total_value_usd=portfolio.total_value_usd,
-            chains_count=portfolio.chains_count,
-            tokens_count=portfolio.tokens_count,
-            native_value_usd=portfolio.native_value_usd,
-            erc20_value_usd=portfolio.erc20_value_usd,
-            breakdown_by_chain=portfolio.breakdown_by_chain,
-            breakdown_by_token=portfolio.breakdown_by_token,
-            warnings=portfolio.warnings,
-            timestamp=portfolio.timestamp
-        )
 
-    except Exception as e:
-        logger.error(f"Portfolio fetch error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Portfolio fetch failed: {str(e)}")
+# Agent Discovery Endpoints
+_AGENT_JSON = orjson.dumps({
+    "name": "Wallet Portfolio Tracker",
+    "description": "Multi-chain wallet portfolio aggregation with real-time valuations. Track your entire crypto portfolio across 7+ chains with automatic price fetching and comprehensive breakdowns.",
+    "url": f"{base_url}/",
+    "version": "1.0.0",
+    "capabilities": {
+        "streaming": False,
+        "pushNotifications": False,
+        "stateTransitionHistory": True,
+        "extensions": [
+            {
+                "uri": "https://github.com/google-agentic-commerce/ap2/tree/v0.1",
+                "description": "Agent Payments Protocol (AP2)",
+                "required": True,
+                "params": {"roles": ["merchant"]}
+            }
+        ]
+    },
+    "defaultInputModes": ["application/json"],
+    "defaultOutputModes": ["application/json"],
+    "entrypoints": {
+        "portfolio-tracker": {
+            "description": "Get wallet portfolio across multiple chains",
+            "streaming": False,
+            "input_schema": {
+                "$schema": "https://json-schema.org/draft/2020-12/schema",
+                "type": "object",
+                "properties": {
+                    "wallet_address": {"type": "string"},
+                    "chains": {"type": "array", "items": {"type": "integer"}},
+                    "tokens": {"type": "array", "items": {"type": "string"}},
+                    "top_k": {"type": "integer", "minimum": 1}
+                },
+                "required": ["wallet_address"]
+            },
+            "output_schema": {
+                "$schema": "https://json-schema.org/draft/2020-12/schema",
+                "type": "object",
+                "properties": {
+                    "total_value_usd": {"type": "number"},
+                    "chains_count": {"type": "integer"},
+                    "breakdown_by_chain": {"type": "array"},
+                    "breakdown_by_token": {"type": "array"}
+                }
+            },
+            "pricing": {"invoke": "0.05 USDC"}
+        }
+    },
+    "payments": [
+        {
+            "method": "x402",
+            "payee": payment_address,
+            "network": "base",
+            "endpoint": "https://facilitator.daydreams.systems",
+            "priceModel": {"default": "0.05"},
+            "extensions": {
+                "x402": {"facilitatorUrl": "https://facilitator.daydreams.systems"}
+            }
+        }
+    ]
+})
+_AGENT_ETAG = _etag(_AGENT_JSON)
 
 
-# Agent Discovery Endpoints
 @app.get("/.well-known/agent.json")
-async def agent_metadata():
+async def agent_metadata(http_request: Request):
     """Agent metadata for service discovery"""
-    return {
-        "name": "Wallet Portfolio Tracker",
-        "description": "Multi-chain wallet portfolio aggregation with real-time valuations. Track your entire crypto portfolio across 7+ chains with automatic price fetching and comprehensive breakdowns.",
-        "url": f"{base_url}/",
-        "version": "1.0.0",
-        "capabilities": {
-            "streaming": False,
-            "pushNotifications": False,
-            "stateTransitionHistory": True,
-            "extensions": [
-                {
-                    "uri": "https://github.com/google-agentic-commerce/ap2/tree/v0.1",
-                    "description": "Agent Payments Protocol (AP2)",
-                    "required": True,
-                    "params": {"roles": ["merchant"]}
-                }
-            ]
-        },
-        "defaultInputModes": ["application/json"],
-        "defaultOutputModes": ["application/json"],
-        "entrypoints": {
-            "portfolio-tracker": {
-                "description": "Get wallet portfolio across multiple chains",
-                "streaming": False,
-                "input_schema": {
-                    "$schema": "https://json-schema.org/draft/2020-12/schema",
-                    "type": "object",
-                    "properties": {
-                        "wallet_address": {"type": "string"},
-                        "chains": {"type": "array", "items": {"type": "integer"}},
-                        "tokens": {"type": "array", "items": {"type": "string"}}
-                    },
-                    "required": ["wallet_address"]
+    not_modified = _not_modified(http_request, _AGENT_ETAG)
+    if not_modified is not None:
+        return not_modified
+    return Response(content=_AGENT_JSON, media_type="application/json", headers={"ETag": _AGENT_ETAG})
+
+
+_X402_JSON = orjson.dumps({
+    "x402Version": 1,
+    "accepts": [
+        {
+            "scheme": "exact",
+            "network": "base",
+            "maxAmountRequired": "50000",  # 0.05 USDC
+            "resource": f"{base_url}/entrypoints/portfolio-tracker/invoke",
+            "description": "Multi-chain wallet portfolio with automatic valuations and comprehensive breakdowns",
+            "mimeType": "application/json",
+            "payTo": payment_address,
+            "maxTimeoutSeconds": 30,
+            "asset": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",  # USDC on Base
+            "outputSchema": {
+                "input": {
+                    "type": "http",
+                    "method": "POST",
+                    "bodyType": "json",
+                    "bodyFields": {
+                        "wallet_address": {
+                            "type": "string",
+                            "required": True,
+                            "description": "Wallet address to track"
+                        },
+                        "chains": {
+                            "type": "array",
+                            "required": False,
+                            "description": "Specific chains to check"
+                        },
+                        "top_k": {
+                            "type": "integer",
+                            "required": False,
+                            "minimum": 1,
+                            "description": "Only return the N most valuable chains and tokens in each breakdown (optional)"
+                        }
+                    }
                 },
-                "output_schema": {
-                    "$schema": "https://json-schema.org/draft/2020-12/schema",
+                "output": {
                     "type": "object",
                     "properties": {
                         "total_value_usd": {"type": "number"},
                         "chains_count": {"type": "integer"},
-                        "breakdown_by_chain": {"type": "array"},
-                        "breakdown_by_token": {"type": "array"}
+                        "breakdown_by_chain": {"type": "array"}
                     }
-                },
-                "pricing": {"invoke": "0.05 USDC"}
-            }
-        },
-        "payments": [
-            {
-                "method": "x402",
-                "payee": payment_address,
-                "network": "base",
-                "endpoint": "https://facilitator.daydreams.systems",
-                "priceModel": {"default": "0.05"},
-                "extensions": {
-                    "x402": {"facilitatorUrl": "https://facilitator.daydreams.systems"}
                 }
+            },
+            "extra": {
+                "supported_chains": [1, 56, 137, 42161, 10, 8453, 43114],
+                "features": [
+                    "multi_chain_aggregation",
+                    "automatic_pricing",
+                    "native_token_tracking",
+                    "erc20_token_tracking",
+                    "portfolio_breakdown",
+                    "total_value_calculation"
+                ],
+                "integrations": ["price_oracle"]
             }
-        ]
-    }
+        }
+    ]
+})
+_X402_ETAG = _etag(_X402_JSON)
 
 
 @app.get("/.well-known/x402")
-async def x402_metadata():
+async def x402_metadata(http_request: Request):
     """x402 payment metadata"""
-    return {
-        "x402Version": 1,
-        "accepts": [
-            {
-                "scheme": "exact",
-                "network": "base",
-                "maxAmountRequired": "50000",  # 0.05 USDC
-                "resource": f"{base_url}/entrypoints/portfolio-tracker/invoke",
-                "description": "Multi-chain wallet portfolio with automatic valuations and comprehensive breakdowns",
-                "mimeType": "application/json",
-                "payTo": payment_address,
-                "maxTimeoutSeconds": 30,
-                "asset": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",  # USDC on Base
-                "outputSchema": {
-                    "input": {
-                        "type": "http",
-                        "method": "POST",
-                        "bodyType": "json",
-                        "bodyFields": {
-                            "wallet_address": {
-                                "type": "string",
-                                "required": True,
-                                "description": "Wallet address to track"
-                            },
-                            "chains": {
-                                "type": "array",
-                                "required": False,
-                                "description": "Specific chains to check"
-                            }
-                        }
-                    },
-                    "output": {
-                        "type": "object",
-                        "properties": {
-                            "total_value_usd": {"type": "number"},
-                            "chains_count": {"type": "integer"},
-                            "breakdown_by_chain": {"type": "array"}
-                        }
-                    }
-                },
-                "extra": {
-                    "supported_chains": [1, 56, 137, 42161, 10, 8453, 43114],
-                    "features": [
-                        "multi_chain_aggregation",
-                        "automatic_pricing",
-                        "native_token_tracking",
-                        "erc20_token_tracking",
-                        "portfolio_breakdown",
-                        "total_value_calculation"
-                    ],
-                    "integrations": ["price_oracle"]
-                }
-            }
-        ]
-    }
+    not_modified = _not_modified(http_request, _X402_ETAG)
+    if not_modified is not None:
+        return not_modified
+    return Response(content=_X402_JSON, media_type="application/json", headers={"ETag": _X402_ETAG})
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    # "auto" uses uvloop where it is installed (it isn't on Windows)
+    uvicorn.run(app, host="0.0.0.0", port=PORT, loop="auto")
@@ -1,16 +1,82 @@
 """
 Portfolio Aggregator - Aggregate balances and calculate total value
 """
+import asyncio
+import heapq
 import logging
+import operator
+import time
 import aiohttp
-from typing import Dict, List, Optional
+import orjson
+from contextlib import aclosing
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING, AsyncIterable, AsyncIterator, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+)
 from dataclasses import dataclass
-from collections import defaultdict
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Fallback prices for major tokens (rough estimates)
+_FALLBACK_PRICES: Mapping[str, float] = MappingProxyType({
+    "ETH": 3000.0,
+    "BNB": 600.0,
+    "MATIC": 1.0,
+    "AVAX": 40.0,
+    "USDC": 1.0,
+    "USDT": 1.0,
+    "DAI": 1.0,
+    "WETH": 3000.0,
+    "WBNB": 600.0,
+    "WMATIC": 1.0,
+})
+
+# Oracle lookup result meaning "no oracle price, use the fallback table"
+# (as opposed to the oracle answering with a null price)
+_MISSING = object()
+
+# In-flight bulk lookup result meaning "not answered, look this token up alone"
+_RETRY = object()
+
+
+def _redis_price_key(chain_id: int, token_address: str) -> str:
+    """Redis key under which an oracle price is shared"""
+    return f"price:{chain_id}:{token_address.lower()}"
+
+
+async def _iter_batches(
+    balances: Union[List[Dict], AsyncIterable[List[Dict]]]
+) -> AsyncIterator[List[Dict]]:
+    """Yield balance batches; a plain list is treated as a single batch"""
+    if isinstance(balances, list):
+        yield balances
+    else:
+        try:
+            async for batch in balances:
+                yield batch
+        finally:
+            # Close an abandoned source generator now rather than at GC, so
+            # its cleanup (e.g. cancelling outstanding fetches) runs promptly
+            aclose = getattr(balances, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+class Balance(NamedTuple):
+    """Priced balance, the fixed-shape row the aggregation loop reads"""
+    chain_id: int
+    chain_name: Optional[str]
+    symbol: Optional[str]
+    balance: Optional[float]
+    value_usd: float
+    price_usd: Optional[float]
+    token_type: Optional[str]
+
+
+@dataclass(slots=True, frozen=True)
 class PortfolioSummary:
     """Portfolio summary result"""
     wallet_address: str
@@ -28,90 +94,167 @@ class PortfolioSummary:
 class PortfolioAggregator:
     """Aggregate portfolio balances and calculate total value"""
 
-    def __init__(self, price_oracle_url: Optional[str] = None):
+    def __init__(
+        self,
+        price_oracle_url: Optional[str] = None,
+        price_cache_ttl: float = 300.0,
+        max_concurrent_oracle_requests: int = 32,
+        redis: Optional["Redis"] = None
+    ):
         """
         Initialize aggregator
 
         Args:
             price_oracle_url: URL of price oracle service (optional)
+            price_cache_ttl: Seconds to reuse an oracle price
+            max_concurrent_oracle_requests: Cap on simultaneous per-token oracle calls
+            redis: Redis client to share oracle prices across workers (optional)
         """
         self.price_oracle_url = price_oracle_url
+        self.price_cache_ttl = price_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._oracle_semaphore = asyncio.Semaphore(max_concurrent_oracle_requests)
+        self._redis = redis
+        # (chain_id, token_address) -> (price_usd or _MISSING, monotonic expiry)
+        self._price_cache: Dict[Tuple[int, str], Tuple[object, float]] = {}
+        # Oracle lookups in flight, shared by concurrent callers for the same token
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        # Monotonic time until which the batch endpoint is skipped (inf if the
+        # oracle doesn't expose it, a back-off if it misbehaves)
+        self._bulk_disabled_until = 0.0
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled HTTP session used for oracle calls"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=32,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the oracle HTTP session (call on app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def aggregate_portfolio(
         self,
         wallet_address: str,
-        balances: List[Dict]
+        balances: Union[List[Dict], AsyncIterable[List[Dict]]],
+        top_k: Optional[int] = None
     ) -> PortfolioSummary:
         """
         Aggregate portfolio balances and calculate total value
 
         Args:
             wallet_address: Wallet address
-            balances: List of balance data from all chains
+            balances: List of balance data from all chains, or an async
+                iterable yielding each chain's balances as they arrive
+            top_k: Only keep the top_k most valuable entries in each breakdown
 
         Returns:
             PortfolioSummary with aggregated data
         """
-        # Filter out errors
-        valid_balances = [b for b in balances if not b.get("error")]
+        all_balances = []
+        valid_balances = []
+        pricing = []
+
+        try:
+            async with aclosing(_iter_batches(balances)) as batches:
+                async for batch in batches:
+                    all_balances.extend(batch)
+
+                    # Filter out errors
+                    valid_batch = [b for b in batch if not b.get("error")]
+                    if valid_batch:
+                        valid_balances.extend(valid_batch)
+                        # Price this batch while later batches are still being fetched
+                        pricing.append(asyncio.ensure_future(self._enrich_with_prices(valid_batch)))
+
+            # Fetch prices for all tokens
+            priced_batches = await asyncio.gather(*pricing)
+        except BaseException:
+            for task in pricing:
+                task.cancel()
+            raise
 
         if not valid_balances:
-            return self._create_empty_portfolio(wallet_address, balances)
-
-        # Fetch prices for all tokens
-        balances_with_prices = await self._enrich_with_prices(valid_balances)
-
-        # Calculate totals
-        total_value = sum(b.get("value_usd", 0) for b in balances_with_prices)
-        native_value = sum(
-            b.get("value_usd", 0) for b in balances_with_prices
-            if b.get("token_type") == "native"
-        )
-        erc20_value = sum(
-            b.get("value_usd", 0) for b in balances_with_prices
-            if b.get("token_type") == "erc20"
-        )
-
-        # Group by chain
-        by_chain = defaultdict(lambda: {"value_usd": 0, "tokens": []})
-        for balance in balances_with_prices:
-            chain_id = balance["chain_id"]
-            by_chain[chain_id]["chain_id"] = chain_id
-            by_chain[chain_id]["chain_name"] = balance.get("chain_name", f"Chain {chain_id}")
-            by_chain[chain_id]["value_usd"] += balance.get("value_usd", 0)
-            by_chain[chain_id]["tokens"].append({
-                "symbol": balance.get("symbol"),
-                "balance": balance.get("balance"),
-                "value_usd": balance.get("value_usd", 0)
+            return self._create_empty_portfolio(wallet_address, all_balances)
+
+        balances_with_prices = [row for batch in priced_batches for row in batch]
+
+        # Calculate totals and group by chain and by token in a single pass
+        total_value = 0
+        native_value = 0
+        erc20_value = 0
+        max_value = 0
+        no_price_count = 0
+        chain_ids = set()
+        by_chain: Dict[int, Dict] = {}
+        by_token: Dict[str, Dict] = {}
+
+        for row in balances_with_prices:
+            chain_id, chain_name, symbol, amount, value_usd, price_usd, token_type = row
+            total_value += value_usd
+            if value_usd > max_value:
+                max_value = value_usd
+            if price_usd is None:
+                no_price_count += 1
+
+            if token_type == "native":
+                native_value += value_usd
+            elif token_type == "erc20":
+                erc20_value += value_usd
+
+            chain_ids.add(chain_id)
+
+            chain_entry = by_chain.get(chain_id)
+            if chain_entry is None:
+                chain_entry = by_chain[chain_id] = {
+                    "chain_id": chain_id,
+                    "chain_name": chain_name if chain_name is not None else f"Chain {chain_id}",
+                    "value_usd": 0,
+                    "tokens": []
+                }
+            chain_entry["value_usd"] += value_usd
+            chain_entry["tokens"].append({
+                "symbol": symbol,
+                "balance": amount,
+                "value_usd": value_usd
             })
 
-        # Sort by value
-        breakdown_by_chain = sorted(
-            list(by_chain.values()),
-            key=lambda x: x["value_usd"],
-            reverse=True
-        )
+            token_key = symbol if symbol is not None else "UNKNOWN"
+            token_entry = by_token.get(token_key)
+            if token_entry is None:
+                token_entry = by_token[token_key] = {
+                    "symbol": token_key,
+                    "balance": 0,
+                    "value_usd": 0,
+                    "chains": []
+                }
+            token_entry["balance"] += amount or 0
+            token_entry["value_usd"] += value_usd
+            token_entry["chains"].append(chain_name)
 
-        # Group by token (across all chains)
-        by_token = defaultdict(lambda: {"balance": 0, "value_usd": 0, "chains": []})
-        for balance in balances_with_prices:
-            symbol = balance.get("symbol", "UNKNOWN")
-            by_token[symbol]["symbol"] = symbol
-            by_token[symbol]["balance"] += balance.get("balance", 0)
-            by_token[symbol]["value_usd"] += balance.get("value_usd", 0)
-            by_token[symbol]["chains"].append(balance.get("chain_name"))
-
-        breakdown_by_token = sorted(
-            list(by_token.values()),
-            key=lambda x: x["value_usd"],
-            reverse=True
-        )
+        # Sort by value
+        by_value = operator.itemgetter("value_usd")
+        if top_k is not None:
+            breakdown_by_chain = heapq.nlargest(top_k, by_chain.values(), key=by_value)
+            breakdown_by_token = heapq.nlargest(top_k, by_token.values(), key=by_value)
+        else:
+            breakdown_by_chain = sorted(by_chain.values(), key=by_value, reverse=True)
+            breakdown_by_token = sorted(by_token.values(), key=by_value, reverse=True)
 
         # Generate warnings
-        warnings = self._generate_warnings(balances_with_prices, total_value)
+        warnings = self._generate_warnings(no_price_count, max_value, total_value)
 
         # Count unique values
-        chains_count = len(set(b["chain_id"] for b in valid_balances))
+        chains_count = len(chain_ids)
         tokens_count = len(valid_balances)
 
         return PortfolioSummary(
@@ -124,34 +267,59 @@ class PortfolioAggregator:
             breakdown_by_chain=breakdown_by_chain,
             breakdown_by_token=breakdown_by_token,
             warnings=warnings,
-            timestamp=""  # Will be set by caller
+            timestamp=""  # Set by caller via dataclasses.replace
         )
 
-    async def _enrich_with_prices(self, balances: List[Dict]) -> List[Dict]:
-        """Fetch prices and add value_usd to each balance"""
-        enriched = []
+    async def _enrich_with_prices(self, balances: List[Dict]) -> List[Balance]:
+        """Fetch prices and return each balance as a priced Balance row"""
+        queries = [
+            (balance.get("chain_id"), balance["contract_address"])
+            for balance in balances
+            if balance.get("contract_address")
+        ]
+
+        # Warm the price cache from Redis, then with one bulk oracle request
+        await self._load_shared_prices(queries)
+        await self._prefetch_prices_bulk(queries)
+
+        # Fetch all prices concurrently (mostly cache hits after the prefetch)
+        prices = await asyncio.gather(
+            *(
+                self._get_token_price(
+                    balance.get("contract_address") or "native",
+                    balance.get("chain_id"),
+                    balance.get("symbol")
+                )
+                for balance in balances
+            ),
+            return_exceptions=True
+        )
 
-        for balance in balances:
-            balance_copy = balance.copy()
-
-            # Get price
-            price_usd = await self._get_token_price(
-                balance.get("contract_address") or "native",
-                balance.get("chain_id"),
-                balance.get("symbol")
-            )
+        rows = []
+        for balance, price_usd in zip(balances, prices):
+            if isinstance(price_usd, Exception):
+                logger.warning(f"Price fetch failed for {balance.get('symbol')}: {price_usd}")
+                price_usd = None
 
             # Calculate value
-            if price_usd is not None and balance.get("balance"):
-                balance_copy["price_usd"] = price_usd
-                balance_copy["value_usd"] = price_usd * balance.get("balance", 0)
+            amount = balance.get("balance")
+            if price_usd is not None and amount:
+                value_usd = price_usd * amount
             else:
-                balance_copy["price_usd"] = None
-                balance_copy["value_usd"] = 0
+                price_usd = None
+                value_usd = 0
 
-            enriched.append(balance_copy)
+            rows.append(Balance(
+                balance["chain_id"],
+                balance.get("chain_name"),
+                balance.get("symbol"),
+                amount,
+                value_usd,
+                price_usd,
+                balance.get("token_type")
+            ))
 
-        return enriched
+        return rows
 
     async def _get_token_price(
         self,
@@ -172,51 +340,259 @@ class PortfolioAggregator:
         """
         # If we have price oracle URL, use it
         if self.price_oracle_url and token_address != "native":
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{self.price_oracle_url}/entrypoints/price-oracle/invoke",
-                        json={
-                            "token_address": token_address,
-                            "chain_id": chain_id
-                        },
-                        timeout=aiohttp.ClientTimeout(total=10)
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            return data.get("price_usd")
-            except Exception as e:
-                logger.warning(f"Price oracle fetch failed: {e}")
+            key = (chain_id, token_address)
+
+            cached = self._price_cache.get(key)
+            if cached is not None and time.monotonic() < cached[1]:
+                price_usd = cached[0]
+            else:
+                while True:
+                    future = self._inflight.get(key)
+                    if future is None:
+                        future = asyncio.ensure_future(self._fetch_oracle_price(token_address, chain_id))
+                        self._track_inflight(key, future)
+                    # Shielded so a cancelled caller doesn't cancel the shared lookup
+                    price_usd = await asyncio.shield(future)
+                    if price_usd is not _RETRY:
+                        break
+                    # Unanswered by the batch: drop it so the next pass starts
+                    # a per-token lookup instead of re-awaiting the done future
+                    self._release_inflight(key, future)
+
+            if price_usd is not _MISSING:
+                return price_usd
 
         # Fallback to hardcoded prices for major tokens
         return self._get_fallback_price(symbol)
 
+    async def _fetch_oracle_price(self, token_address: str, chain_id: int):
+        """Query the price oracle and cache the answer; _MISSING on failure"""
+        try:
+            session = await self._get_session()
+            async with self._oracle_semaphore:
+                async with session.post(
+                    f"{self.price_oracle_url}/entrypoints/price-oracle/invoke",
+                    json={
+                        "token_address": token_address,
+                        "chain_id": chain_id
+                    }
+                ) as response:
+                    if response.status != 200:
+                        return _MISSING
+                    data = orjson.loads(await response.read())
+                    price_usd = data.get("price_usd")
+        except Exception as e:
+            logger.warning(f"Price oracle fetch failed: {e}")
+            return _MISSING
+
+        self._price_cache[(chain_id, token_address)] = (
+            price_usd,
+            time.monotonic() + self.price_cache_ttl
+        )
+        await self._store_shared_prices({(chain_id, token_address): price_usd})
+        return price_usd
+
+    async def _prefetch_prices_bulk(self, queries: List[Tuple[int, str]]):
+        """
+        Price many tokens with one POST to the oracle's batch endpoint
+
+        Expects a response of the form
+        {"prices": [{"chain_id": ..., "token_address": ..., "price_usd": ...}]}.
+        Returned prices are cached like single lookups; queried tokens missing
+        from the response are left to per-token lookups. If the oracle has no
+        batch endpoint, bulk lookups are disabled for good; if it errors or
+        answers in an unexpected shape, they are disabled for one price TTL.
+
+        While the request is in flight, each queried token is registered as
+        an in-flight lookup, so concurrent callers wait for the batch instead
+        of querying the oracle again. If the batch fails they fall back to
+        per-token lookups.
+
+        Args:
+            queries: (chain_id, token_address) pairs to price
+        """
+        now = time.monotonic()
+        if not self.price_oracle_url or now < self._bulk_disabled_until:
+            return
+
+        pending = []
+        for key in dict.fromkeys(queries):
+            cached = self._price_cache.get(key)
+            if (cached is None or now >= cached[1]) and key not in self._inflight:
+                pending.append(key)
+
+        if len(pending) < 2:
+            return
+
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in pending}
+        for key, future in futures.items():
+            self._track_inflight(key, future)
+
+        results = None
+        try:
+            results = await self._fetch_oracle_prices_bulk(pending)
+        finally:
+            for key, future in futures.items():
+                # Released before resolving so no caller can pick up a done future
+                self._release_inflight(key, future)
+                future.set_result(_RETRY if results is None else results[key])
+
+    async def _fetch_oracle_prices_bulk(
+        self,
+        pending: List[Tuple[int, str]]
+    ) -> Optional[Dict[Tuple[int, str], object]]:
+        """Query the oracle's batch endpoint and cache the answers; None on failure"""
+        try:
+            session = await self._get_session()
+            async with session.post(
+                f"{self.price_oracle_url}/entrypoints/price-oracle/invoke-batch",
+                json={
+                    "tokens": [
+                        {"chain_id": chain_id, "token_address": token_address}
+                        for chain_id, token_address in pending
+                    ]
+                }
+            ) as response:
+                if response.status in (404, 405):
+                    logger.info("Price oracle has no batch endpoint, using per-token lookups")
+                    self._bulk_disabled_until = float("inf")
+                    return None
+                if response.status != 200:
+                    raise ValueError(f"status {response.status}")
+                data = orjson.loads(await response.read())
+            if not isinstance(data, dict) or not isinstance(data.get("prices"), list):
+                raise ValueError("response has no prices list")
+        except Exception as e:
+            logger.warning(
+                f"Bulk price oracle fetch failed ({e}), "
+                f"using per-token lookups for {self.price_cache_ttl:g}s"
+            )
+            self._bulk_disabled_until = time.monotonic() + self.price_cache_ttl
+            return None
+
+        expiry = time.monotonic() + self.price_cache_ttl
+        prices = {}
+        for item in data["prices"]:
+            try:
+                key = (int(item["chain_id"]), str(item["token_address"]).lower())
+            except (KeyError, TypeError, ValueError):
+                continue
+            prices[key] = item.get("price_usd")
+
+        results = {}
+        found = {}
+        for chain_id, token_address in pending:
+            price_usd = prices.get((chain_id, token_address.lower()), _RETRY)
+            results[(chain_id, token_address)] = price_usd
+            if price_usd is not _RETRY:
+                self._price_cache[(chain_id, token_address)] = (price_usd, expiry)
+                found[(chain_id, token_address)] = price_usd
+
+        await self._store_shared_prices(found)
+        return results
+
+    async def _load_shared_prices(self, queries: List[Tuple[int, str]]):
+        """
+        Fill the local price cache from Redis with a single MGET
+
+        Entries carry the wall-clock time the oracle price expires, so a
+        shared price is only reused for whatever is left of its TTL.
+
+        Args:
+            queries: (chain_id, token_address) pairs to look up
+        """
+        if self._redis is None or not self.price_oracle_url:
+            return
+
+        now = time.monotonic()
+        pending = []
+        for key in dict.fromkeys(queries):
+            cached = self._price_cache.get(key)
+            if cached is None or now >= cached[1]:
+                pending.append(key)
+
+        if not pending:
+            return
+
+        try:
+            values = await self._redis.mget([_redis_price_key(*key) for key in pending])
+        except Exception as e:
+            logger.warning(f"Redis price lookup failed: {e}")
+            return
+
+        now = time.monotonic()
+        wall_now = time.time()
+        for key, value in zip(pending, values):
+            if value is None:
+                continue
+            try:
+                price_usd, expires_at = orjson.loads(value)
+                remaining = float(expires_at) - wall_now
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring unreadable Redis price for {key}")
+                continue
+            if remaining > 0:
+                self._price_cache[key] = (price_usd, now + min(remaining, self.price_cache_ttl))
+
+    async def _store_shared_prices(self, prices: Dict[Tuple[int, str], Optional[float]]):
+        """
+        Publish oracle answers to Redis so other workers can reuse them
+
+        Args:
+            prices: (chain_id, token_address) -> price_usd as answered by the oracle
+        """
+        if self._redis is None or not prices:
+            return
+
+        ttl = max(1, int(self.price_cache_ttl))
+        expires_at = time.time() + self.price_cache_ttl
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for (chain_id, token_address), price_usd in prices.items():
+                    pipe.set(
+                        _redis_price_key(chain_id, token_address),
+                        orjson.dumps([price_usd, expires_at]),
+                        ex=ttl
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis price store failed: {e}")
+
     def _get_fallback_price(self, symbol: str) -> Optional[float]:
         """Fallback prices for major tokens (rough estimates)"""
-        fallback_prices = {
-            "ETH": 3000.0,
-            "BNB": 600.0,
-            "MATIC": 1.0,
-            "AVAX": 40.0,
-            "USDC": 1.0,
-            "USDT": 1.0,
-            "DAI": 1.0,
-            "WETH": 3000.0,
-            "WBNB": 600.0,
-            "WMATIC": 1.0,
-        }
-        return fallback_prices.get(symbol)
+        return _FALLBACK_PRICES.get(symbol)
+
+    def _track_inflight(self, key: Tuple[int, str], future: asyncio.Future):
+        """Share an oracle lookup with concurrent callers until it completes"""
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._release_inflight(key, future))
+
+    def _release_inflight(self, key: Tuple[int, str], future: asyncio.Future):
+        """Stop sharing a lookup, unless a newer one has replaced it"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
 
     def _generate_warnings(
         self,
-        balances: List[Dict],
+        no_price_count: int,
+        max_value: float,
         total_value: float
     ) -> List[str]:
-        """Generate warnings about portfolio"""
+        """
+        Generate warnings about portfolio
+
+        Args:
+            no_price_count: Number of balances without a price
+            max_value: USD value of the largest single balance
+            total_value: Total portfolio value in USD
+
+        Returns:
+            List of warning messages
+        """
         warnings = []
 
         # Check for tokens without prices
-        no_price_count = sum(1 for b in balances if b.get("price_usd") is None)
         if no_price_count > 0:
             warnings.append(
                 f"ℹ️ {no_price_count} token(s) missing price data - using fallback estimates"
@@ -229,12 +605,10 @@ class PortfolioAggregator:
             )
 
         # Check for concentration
-        if balances:
-            max_value = max(b.get("value_usd", 0) for b in balances)
-            if total_value > 0 and (max_value / total_value) > 0.9:
-                warnings.append(
-                    "⚠️ Portfolio highly concentrated in single asset"
-                )
+        if total_value > 0 and (max_value / total_value) > 0.9:
+            warnings.append(
+                "⚠️ Portfolio highly concentrated in single asset"
+            )
 
         return warnings
 
@@ -180,6 +180,12 @@ class X402Middleware(BaseHTTPMiddleware):
                                     "type": "array",
                                     "required": False,
                                     "description": "Specific token addresses to check (optional)"
+                                },
+                                "top_k": {
+                                    "type": "integer",
+                                    "required": False,
+                                    "minimum": 1,
+                                    "description": "Only return the N most valuable chains and tokens in each breakdown (optional)"
                                 }
                             }
                         },
@@ -273,6 +279,12 @@ class X402Middleware(BaseHTTPMiddleware):
                                         "type": "array",
                                         "required": False,
                                         "description": "Specific token addresses to check (optional)"
+                                    },
+                                    "top_k": {
+                                        "type": "integer",
+                                        "required": False,
+                                        "minimum": 1,
+                                        "description": "Only return the N most valuable chains and tokens in each breakdown (optional)"
                                     }
                                 }
                             },
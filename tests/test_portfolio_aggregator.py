@@ -0,0 +1,102 @@
+"""
+Tests for PortfolioAggregator price lookups
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from src.portfolio_aggregator import _RETRY, PortfolioAggregator
+
+TOKENS = ["0x" + "11" * 20, "0x" + "22" * 20, "0x" + "33" * 20]
+
+
+def _balances():
+    return [
+        {
+            "chain_id": 1,
+            "chain_name": "Ethereum",
+            "token_type": "erc20",
+            "symbol": f"T{i}",
+            "balance": 1.0,
+            "contract_address": token,
+        }
+        for i, token in enumerate(TOKENS)
+    ]
+
+
+def _failed_batch(aggregator, pending):
+    return None
+
+
+def _partial_batch(aggregator, pending):
+    """Answer only the first token, caching it like the real batch call"""
+    results = {}
+    for key in pending:
+        if key[1] == TOKENS[0]:
+            aggregator._price_cache[key] = (5.0, time.monotonic() + 300)
+            results[key] = 5.0
+        else:
+            results[key] = _RETRY
+    return results
+
+
+class ConcurrentBulkPricingTest(unittest.TestCase):
+    """Two concurrent enrichments of the same tokens sharing one bulk lookup"""
+
+    def _run_concurrent(self, batch_answer):
+        aggregator = PortfolioAggregator("http://oracle.invalid")
+        calls = {"bulk": 0, "single": 0}
+
+        async def fetch_bulk(pending):
+            calls["bulk"] += 1
+            # One yield lets the second enrichment queue its lookups on the
+            # bulk futures before they resolve
+            await asyncio.sleep(0)
+            return batch_answer(aggregator, pending)
+
+        async def fetch_single(token_address, chain_id):
+            calls["single"] += 1
+            await asyncio.sleep(0)
+            return 2.0
+
+        aggregator._fetch_oracle_prices_bulk = fetch_bulk
+        aggregator._fetch_oracle_price = fetch_single
+
+        async def main():
+            return await asyncio.gather(
+                aggregator._enrich_with_prices(_balances()),
+                aggregator._enrich_with_prices(_balances()),
+            )
+
+        # A spinning event loop never yields to a timeout, so run it in a thread
+        outcome = {}
+        thread = threading.Thread(
+            target=lambda: outcome.update(result=asyncio.run(main())),
+            daemon=True
+        )
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), "concurrent enrichment hung")
+        self.assertEqual(aggregator._inflight, {})
+        return outcome["result"], calls
+
+    def test_failed_batch_falls_back_to_single_lookups(self):
+        results, calls = self._run_concurrent(_failed_batch)
+
+        for rows in results:
+            self.assertEqual([row.price_usd for row in rows], [2.0, 2.0, 2.0])
+        self.assertEqual(calls["bulk"], 1)
+        self.assertEqual(calls["single"], len(TOKENS))
+
+    def test_partial_batch_looks_up_missing_tokens(self):
+        results, calls = self._run_concurrent(_partial_batch)
+
+        for rows in results:
+            self.assertEqual([row.price_usd for row in rows], [5.0, 2.0, 2.0])
+        self.assertEqual(calls["bulk"], 1)
+        self.assertEqual(calls["single"], len(TOKENS) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()